@@ -3,8 +3,11 @@ This file contains contains helper functions callable by any of the 2 bots.
 '''
 
 import logging
-import pickle
-import pandas as pd
+from typing import TYPE_CHECKING
+
+# pandas is only imported where it's needed to keep bot startup fast
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def log(msg, level="INFO") -> None:
@@ -30,8 +33,9 @@ def df_to_csv(df, csv_path, **kwargs) -> None:
     df2.to_csv(csv_path, index=False, **kwargs)
 
 
-def csv_to_df(csv_path, **kwargs) -> pd.DataFrame:
+def csv_to_df(csv_path, **kwargs) -> "pd.DataFrame":
     """Reads DataFrame from csv with dtypes preserved in 2nd line."""
+    import pandas as pd
     CatchErrs = [KeyError, TypeError]
 
     try:
@@ -79,5 +83,6 @@ def iter_to_str(iterable, ignore_list=[], prefix="\n\n", suffix="\n\n") -> str:
 
 
 def write_to_pickle(obj, filepath):
+    import pickle
     with open(filepath, 'wb') as handle:
         pickle.dump(obj, handle, protocol=pickle.HIGHEST_PROTOCOL)
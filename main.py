@@ -6,6 +6,10 @@ The bot logic is defined in ./telegram_bot.py.
 Written by Al Matty - github.com/al-matty
 """
 
+# Taken first, so the startup timings logged by the bot include import time
+import time
+t_start = time.perf_counter()
+
 import logging
 from telegram_bot import TelegramBot
 
@@ -16,7 +20,10 @@ logger = logging.getLogger(__name__)
 # Toggle more extensive logging (switch off once in production)
 debug_mode = True
 
+# Start polling before the contributor data is loaded (loads in background)
+fast_start = True
+
 # Instantiate & run bot
-tg_bot = TelegramBot(debug_mode=debug_mode)
+tg_bot = TelegramBot(debug_mode=debug_mode, fast_start=fast_start, t_start=t_start)
 tg_bot.run()
 
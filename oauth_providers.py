@@ -0,0 +1,265 @@
+'''
+This file contains the OAuth2 providers used to verify contributor handles.
+Each provider declares its endpoints, scopes, PKCE handling & username
+extraction once. The registry signs the OAuth state, so that the deep link
+coming back to the bot can be dispatched to the right provider directly.
+'''
+
+import os, hmac, time, base64, hashlib, binascii, requests
+from urllib.parse import urlencode, quote
+from helpers import log
+
+# A state is <tag><base64url(issued at + signature)>: 1 + 16 = 17 characters,
+# leaving 47 of the 64 characters Telegram allows in a /start payload.
+TAG_LEN, TIME_BYTES, SIG_BYTES = 1, 4, 8
+STATE_LEN = TAG_LEN + (TIME_BYTES + SIG_BYTES) * 4 // 3
+# Seconds a login link stays valid
+STATE_TTL = 600
+
+
+def discord_username(user_json) -> str:
+    """Discord: 'name' for migrated users, 'name#1234' for legacy ones."""
+    username = user_json.get("username")
+    discriminator = user_json.get("discriminator")
+    if username is None:
+        return None
+    if discriminator in (None, 0, "0"):
+        return str(username)
+    return str(username)+"#"+str(discriminator)
+
+
+def twitter_username(user_json) -> str:
+    """Twitter API v2 wraps the user object in 'data'."""
+    return (user_json.get("data") or {}).get("username")
+
+
+def b64url(raw) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+class InvalidState(Exception):
+    """Raised for deep link payloads that can't be verified."""
+
+    def __init__(self, reason, expired=False):
+        super().__init__(reason)
+        # Correctly signed, but too old. Not a sign of tampering.
+        self.expired = expired
+
+
+class ProviderUnavailable(Exception):
+    """Raised when a provider can't be reached or answers with garbage."""
+
+
+class OAuthProvider:
+    """Endpoints & config of a single OAuth2 provider."""
+
+    def __init__(self, name, tag, label, authorize_url, token_url, user_url,
+                 scope, get_username, handle_col, pkce=False, token_auth="body"):
+        # Name doubles as the platform stored in user_data & the env var prefix
+        self.name = name
+        # Single character identifying the provider inside a signed state
+        self.tag = tag
+        self.label = label
+        self.authorize_url = authorize_url
+        self.token_url = token_url
+        self.user_url = user_url
+        self.scope = scope
+        self.get_username = get_username
+        # Column of the contributor data holding the handles of this provider
+        self.handle_col = handle_col
+        self.pkce = pkce
+        # "body": client secret in the form data, "basic": HTTP basic auth
+        self.token_auth = token_auth
+        self.client_id = None
+        self.client_secret = None
+        self.redirect_uri = None
+
+
+    def configure(self, env=os.environ) -> "OAuthProvider":
+        """Reads client credentials from the environment. Called once at startup."""
+        prefix = f"OAUTH_{self.name.upper()}"
+        self.client_id = env.get(f"{prefix}_CLIENT_ID")
+        self.client_secret = env.get(f"{prefix}_CLIENT_SECRET")
+        self.redirect_uri = env.get("OAUTH_REDIRECT_URI")
+        return self
+
+
+    def login_url(self, state, code_verifier=None) -> str:
+        """The link users follow to log in with the provider."""
+        params = {
+            "response_type": "code",
+            "client_id": self.client_id,
+            "redirect_uri": self.redirect_uri,
+            "scope": self.scope,
+            "state": state,
+        }
+        if self.pkce:
+            params["code_challenge"] = b64url(hashlib.sha256(code_verifier.encode()).digest())
+            params["code_challenge_method"] = "S256"
+        return f"{self.authorize_url}?{urlencode(params, quote_via=quote)}"
+
+
+    def check(self, response):
+        """Server errors & rate limiting aren't the user's fault."""
+        if response.status_code >= 500 or response.status_code == 429:
+            raise ProviderUnavailable(f"{response.url} returned {response.status_code}")
+        return response
+
+
+    def fetch_username(self, auth_code, code_verifier=None) -> str:
+        """
+        Trades auth_code for an access token & returns the username, or None if
+        the provider rejected the code. Raises ProviderUnavailable if the
+        provider can't be reached. Blocking.
+        """
+        payload = {
+            "client_id": self.client_id,
+            "grant_type": "authorization_code",
+            "code": auth_code,
+            "redirect_uri": self.redirect_uri,
+        }
+        auth = None
+        if self.token_auth == "basic":
+            auth = (self.client_id, self.client_secret)
+        else:
+            payload["client_secret"] = self.client_secret
+        if self.pkce:
+            payload["code_verifier"] = code_verifier
+
+        try:
+            headers = {"Content-Type": "application/x-www-form-urlencoded"}
+            token_json = self.check(requests.post(
+                url=self.token_url,
+                data=payload,
+                headers=headers,
+                auth=auth,
+                timeout=10
+            )).json()
+            access_token = token_json.get("access_token")
+            if access_token is None:
+                log(f"{self.name.upper()} REJECTED AUTH CODE: {token_json.get('error')}")
+                return None
+
+            headers = {"Authorization": f"Bearer {access_token}"}
+            user_json = self.check(requests.get(url=self.user_url, headers=headers, timeout=10)).json()
+            return self.get_username(user_json)
+
+        # Connection errors, timeouts & responses that aren't JSON
+        except (requests.RequestException, ValueError) as e:
+            log(f"{self.name.upper()} OAUTH REQUEST FAILED: {e!r}")
+            raise ProviderUnavailable(repr(e)) from e
+
+
+def default_providers() -> list:
+    """All providers the bot knows about."""
+    return [
+        OAuthProvider(
+            name="discord",
+            tag="d",
+            label="Discord",
+            authorize_url="https://discord.com/api/oauth2/authorize",
+            token_url="https://discord.com/api/oauth2/token",
+            user_url="https://discord.com/api/users/@me",
+            scope="identify",
+            get_username=discord_username,
+            handle_col="Discord UserName",
+        ),
+        OAuthProvider(
+            name="twitter",
+            tag="t",
+            label="Twitter",
+            authorize_url="https://twitter.com/i/oauth2/authorize",
+            token_url="https://api.twitter.com/2/oauth2/token",
+            user_url="https://api.twitter.com/2/users/me",
+            scope="users.read tweet.read",
+            get_username=twitter_username,
+            handle_col="Twitter Username",
+            pkce=True,
+            token_auth="basic",
+        ),
+    ]
+
+
+class OAuthRegistry:
+    """
+    Resolves provider config once & signs/verifies OAuth states.
+    A state is bound to the Telegram user who requested the login link & expires
+    after STATE_TTL seconds. The payload coming back via /start is expected as
+    '<state><code>', i.e. the auth code appended to the 17 character state.
+    """
+
+    def __init__(self, providers=None, secret=None, env=os.environ, ttl=STATE_TTL):
+        providers = default_providers() if providers is None else providers
+        self.providers = {p.name: p.configure(env) for p in providers}
+        self.by_tag = {p.tag: p for p in self.providers.values()}
+        self.ttl = ttl
+        # Shared by all instances of the bot, so links survive restarts & scaling
+        secret = secret or env.get("OAUTH_STATE_SECRET")
+        if not secret:
+            raise RuntimeError("OAUTH_STATE_SECRET is not set. Login links can't be signed without it.")
+        self.secret = secret.encode()
+
+
+    def commands(self) -> str:
+        """The login commands for use in replies, e.g. '/discord or /twitter'."""
+        commands = [f"/{name}" for name in self.providers]
+        if len(commands) == 1:
+            return commands[0]
+        return ", ".join(commands[:-1]) + " or " + commands[-1]
+
+
+    def handle_cols(self) -> dict:
+        """Provider name -> column of the contributor data holding its handles."""
+        return {name: p.handle_col for name, p in self.providers.items()}
+
+
+    def sign(self, tag, issued, user_id) -> bytes:
+        msg = tag.encode() + issued + f":{user_id}".encode()
+        return hmac.new(self.secret, msg, hashlib.sha256).digest()[:SIG_BYTES]
+
+
+    def new_state(self, name, user_id) -> str:
+        """Returns a fresh state for user_id logging in with provider name."""
+        tag = self.providers[name].tag
+        issued = int(time.time()).to_bytes(TIME_BYTES, "big")
+        return tag + b64url(issued + self.sign(tag, issued, user_id))
+
+
+    def code_verifier(self, state) -> str:
+        """PKCE verifier derived from the state, so nothing has to be stored."""
+        return b64url(hmac.new(self.secret, f"pkce:{state}".encode(), hashlib.sha256).digest())
+
+
+    def login_url(self, name, user_id) -> str:
+        state = self.new_state(name, user_id)
+        return self.providers[name].login_url(state, self.code_verifier(state))
+
+
+    def resolve(self, payload, user_id) -> tuple:
+        """
+        Verifies a deep link payload. Returns (provider, auth_code, code_verifier).
+        Raises InvalidState if it wasn't signed by us for this user or expired.
+        """
+        state, auth_code = payload[:STATE_LEN], payload[STATE_LEN:]
+        if len(state) != STATE_LEN or not auth_code:
+            raise InvalidState("malformed payload")
+
+        tag = state[:TAG_LEN]
+        provider = self.by_tag.get(tag)
+        if provider is None:
+            raise InvalidState("unknown provider")
+
+        try:
+            raw = base64.b64decode(state[TAG_LEN:], altchars=b"-_", validate=True)
+        except binascii.Error:
+            raise InvalidState("malformed state")
+
+        issued, signature = raw[:TIME_BYTES], raw[TIME_BYTES:]
+        if not hmac.compare_digest(signature, self.sign(tag, issued, user_id)):
+            raise InvalidState("bad signature")
+
+        age = time.time() - int.from_bytes(issued, "big")
+        if not 0 <= age <= self.ttl:
+            raise InvalidState("expired", expired=True)
+
+        return provider, auth_code, self.code_verifier(state)
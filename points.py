@@ -0,0 +1,126 @@
+'''
+This file contains the points recalculation engine. It scores raw contribution
+exports found in the export directory and merges the result into the
+contributor data. Expected exports (any number of files each):
+    discord_*.csv - columns: username, role, messages
+    tweets_*.csv  - columns: username, likes, retweets (one row per tweet)
+Importing this module pulls in pandas, so the bot only imports it when needed.
+'''
+
+import os, glob, time
+import numpy as np
+import pandas as pd
+from helpers import log
+
+POINTS_COL = "Total Contribution Points"
+
+# Discord: a member counts with their highest role only, plus capped activity
+ROLE_POINTS = {"dev": 100, "community manager": 80, "problem solver": 60, "designer": 60}
+MESSAGE_POINTS, MESSAGE_CAP = 0.1, 500
+
+# Twitter: fixed points per tweet plus log-scaled engagement (retweets count double)
+TWEET_POINTS, ENGAGEMENT_POINTS = 5, 2
+
+
+def normalize(handles) -> pd.Series:
+    """Handles are matched case-insensitively & without a leading '@'."""
+    return handles.astype("string").str.strip().str.lstrip("@").str.lower()
+
+
+def read_exports(pattern, columns) -> pd.DataFrame:
+    """Concatenates all csv files matching pattern. Skips files that can't be read."""
+    frames = []
+    for path in sorted(glob.glob(pattern)):
+        try:
+            frames.append(pd.read_csv(path, usecols=columns))
+        # Missing columns, unparsable or empty files
+        except (OSError, ValueError) as e:
+            log(f"SKIPPING MALFORMED EXPORT {path}: {e}")
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def to_number(col) -> pd.Series:
+    return pd.to_numeric(col, errors="coerce").fillna(0)
+
+
+def score_discord(df) -> pd.Series:
+    """Points per normalized Discord handle."""
+    scored = pd.DataFrame({
+        "handle": normalize(df["username"]),
+        "role": normalize(df["role"]).map(ROLE_POINTS).fillna(0).astype(float),
+        "messages": to_number(df["messages"]),
+    })
+    # A handle may show up in several dumps, so the cap applies to the sum
+    per_user = scored.groupby("handle").agg(role=("role", "max"), messages=("messages", "sum"))
+    return per_user["role"] + np.minimum(per_user["messages"], MESSAGE_CAP) * MESSAGE_POINTS
+
+
+def score_twitter(df) -> pd.Series:
+    """Points per normalized Twitter handle."""
+    engagement = to_number(df["likes"]) + 2*to_number(df["retweets"])
+    scored = pd.DataFrame({
+        "handle": normalize(df["username"]),
+        "points": TWEET_POINTS + ENGAGEMENT_POINTS*np.log1p(engagement),
+    })
+    return scored.groupby("handle")["points"].sum()
+
+
+# Export file pattern, required columns & scoring function per platform
+SOURCES = {
+    "discord": ("discord_*.csv", ["username", "role", "messages"], score_discord),
+    "twitter": ("tweets_*.csv", ["username", "likes", "retweets"], score_twitter),
+}
+
+
+def score_exports(export_dir) -> tuple:
+    """
+    Reads & scores all exports. Returns ({platform: points}, {stage: seconds}).
+    A platform whose exports can't be scored is left out, the others still count.
+    """
+    scores, timings = {}, {"load": 0.0, "score": 0.0}
+
+    for platform, (pattern, columns, score) in SOURCES.items():
+        try:
+            t0 = time.perf_counter()
+            df = read_exports(os.path.join(export_dir, pattern), columns)
+            timings["load"] += time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            scores[platform] = score(df)
+            timings["score"] += time.perf_counter() - t0
+
+        except Exception as e:
+            log(f"COULD NOT SCORE {platform.upper()} EXPORTS: {e!r}")
+
+    return scores, timings
+
+
+def apply_scores(df, scores, handle_cols) -> int:
+    """
+    Writes recalculated points into df in place & returns the number of changed
+    rows. Rows matched by none of the exports keep their points. handle_cols
+    maps each platform in scores to the column holding its handles.
+    """
+    total = pd.Series(0.0, index=df.index)
+    matched = pd.Series(False, index=df.index)
+
+    for platform, points in scores.items():
+        col = handle_cols.get(platform)
+        if points.empty or col not in df:
+            continue
+        row_points = normalize(df[col]).map(points).astype(float)
+        matched |= row_points.notna()
+        total += row_points.fillna(0)
+
+    total = total.round(2)
+    old = pd.to_numeric(df[POINTS_COL], errors="coerce") if POINTS_COL in df else pd.Series(np.nan, index=df.index)
+    changed = matched & (old.isna() | ~np.isclose(old.fillna(0), total))
+
+    if changed.any():
+        # Totals aren't whole numbers, so the column is stored as float from now on
+        df[POINTS_COL] = old.astype("float64")
+        df.loc[changed, POINTS_COL] = total[changed]
+
+    return int(changed.sum())
@@ -0,0 +1,96 @@
+'''
+This file contains the admission control for incoming updates: per-user &
+global token buckets, cooldowns after failed verifications and load shedding
+when the update queue gets too deep.
+'''
+
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    """Allows bursts of up to capacity, refilled at rate tokens per second."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stamp = time.monotonic()
+
+
+    def take(self, now, cost=1) -> bool:
+        self.tokens = min(self.capacity, self.tokens + (now-self.stamp)*self.rate)
+        self.stamp = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+
+class RateLimiter:
+    """
+    Decides whether an update gets processed. admit() returns None if so,
+    otherwise the reason for rejecting it: "cooldown", "user", "global" or "busy".
+    """
+
+    def __init__(self, user_rate=0.5, user_burst=5, global_rate=30, global_burst=60,
+                 cooldown=30, max_queue=100, notify_interval=10, max_users=10000):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        # Seconds a user is locked out after a failed verification
+        self.cooldown = cooldown
+        # Update queue size above which new updates are shed
+        self.max_queue = max_queue
+        # Rejected users are told so at most once per notify_interval seconds
+        self.notify_interval = notify_interval
+        # Per-user state is kept for the max_users most recently seen users
+        self.max_users = max_users
+        self.buckets = OrderedDict()
+        self.cooldowns = OrderedDict()
+        self.notified = OrderedDict()
+
+
+    def remember(self, entries, user_id, value) -> None:
+        """Stores value as the most recent entry, evicting the least recent ones."""
+        entries[user_id] = value
+        entries.move_to_end(user_id)
+        while len(entries) > self.max_users:
+            entries.popitem(last=False)
+
+
+    def admit(self, user_id, queue_size=0):
+        now = time.monotonic()
+
+        until = self.cooldowns.get(user_id)
+        if until is not None:
+            if until > now:
+                return "cooldown"
+            del self.cooldowns[user_id]
+
+        if queue_size > self.max_queue:
+            return "busy"
+
+        bucket = self.buckets.get(user_id) or TokenBucket(self.user_rate, self.user_burst)
+        self.remember(self.buckets, user_id, bucket)
+        if not bucket.take(now):
+            return "user"
+
+        if not self.global_bucket.take(now):
+            return "global"
+
+        return None
+
+
+    def penalize(self, user_id) -> None:
+        """Locks user_id out for the cooldown period."""
+        self.remember(self.cooldowns, user_id, time.monotonic() + self.cooldown)
+
+
+    def should_notify(self, user_id) -> bool:
+        """Whether to reply to a rejected update, so spam isn't answered 1:1."""
+        now = time.monotonic()
+        if now - self.notified.get(user_id, float("-inf")) < self.notify_interval:
+            return False
+        self.remember(self.notified, user_id, now)
+        return True
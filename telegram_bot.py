@@ -6,13 +6,16 @@ In this file, the TelegramBot class is defined. Usage: Send /start to initiate
 the conversation on Telegram. Press Ctrl-C on the command line to stop the bot.
 """
 
-import os, asyncio, requests
+import os, time, asyncio
 from helpers import log, df_to_csv, csv_to_df
+from oauth_providers import OAuthRegistry, InvalidState, ProviderUnavailable
+from rate_limit import RateLimiter
 from typing import Dict, List
 from dotenv import load_dotenv
 from warnings import filterwarnings
 from telegram.warnings import PTBUserWarning
 from telegram import (
+    Update,
     ReplyKeyboardMarkup,
     ReplyKeyboardRemove
 )
@@ -22,6 +25,8 @@ from telegram.ext import (
     ConversationHandler,
     MessageHandler,
     CallbackQueryHandler,
+    TypeHandler,
+    ApplicationHandlerStop,
     PicklePersistence,
     PersistenceInput,
     filters,
@@ -34,16 +39,43 @@ out_csv = 'known_users.csv'    # 2 cols: Starknet Address, Total Contribution Po
 class TelegramBot:
     """A class to encapsulate all relevant methods of the Telegram bot."""
 
-    def __init__(self, debug_mode=False):
+    def __init__(self, debug_mode=False, fast_start=False, recalc_interval=3600, oauth_providers=None,
+                 t_start=None):
         """
         Constructor of the class. Initializes certain instance variables.
+        t_start: time.perf_counter() at process start, so that startup timings
+        include import time. Defaults to now.
         """
+        # Reference point for the startup timings reported in the logs
+        self.t_init = time.perf_counter() if t_start is None else t_start
+        self.t_first_response = None
         # The bot data file
         self.data_path = "./data"
         # The contributor data file
         self.input_data_path = "./input_data.csv"
         # Switch on logging of bot data & callback data (inline button presses) for debugging
         self.debug_mode = debug_mode
+        # Start polling right away & warm the contributor store in the background
+        self.fast_start = fast_start
+        # Contributor data, loaded at startup & reloaded whenever the file
+        # changed on disk. store_ready resolves once the first load was tried.
+        self.contributors = None
+        self.store_mtime = None
+        self.store_ready = None
+        self.store_lock = None
+        # Background load started in post_init() when fast_start is on
+        self.warm_task = None
+        # Raw contribution exports, rescored every recalc_interval seconds
+        self.export_dir = "./contributions"
+        self.recalc_interval = recalc_interval
+        # Seconds spent per stage in the last points recalculation
+        self.points_timings = {}
+        # OAuth providers, configured from the environment once
+        self.oauth = OAuthRegistry(oauth_providers)
+        # Pause between confirming a handle & asking for the wallet
+        self.reply_delay = 1.5
+        # Admission control in front of all handlers
+        self.limiter = RateLimiter()
         # Set up conversation states & inline keyboard
         self.CHOOSING, self.TYPING_REPLY = range(2)
         reply_keyboard = [
@@ -73,6 +105,163 @@ class TelegramBot:
         else:
             await update._bot.send_message(update.effective_message.chat_id, msg, **kwargs)
 
+        if self.t_first_response is None:
+            self.t_first_response = time.perf_counter() - self.t_init
+            log(f"TIME TO FIRST RESPONSE: {self.t_first_response:.3f}s")
+
+
+    async def admission_control(self, update, context) -> None:
+        """Runs before all other handlers. Drops updates of users over their limits."""
+        user = update.effective_user
+        if user is None:
+            return
+
+        reason = self.limiter.admit(user.id, self.application.update_queue.qsize())
+        if reason is None:
+            return
+
+        if self.debug_mode:
+            log(f"REJECTED UPDATE FROM {user.id}: {reason}")
+
+        if self.limiter.should_notify(user.id) and update.effective_message:
+            if reason == "cooldown":
+                msg = "Verification failed. Please wait a moment before trying again."
+            elif reason == "busy":
+                msg = "Lots of contributors are checking in right now. Please try again in a minute."
+            else:
+                msg = "Easy there! Please slow down a bit and try again shortly."
+            await self.send_msg(msg, update)
+
+        raise ApplicationHandlerStop
+
+
+    def read_store(self) -> None:
+        """Reads the contributor data & remembers the file's mtime. Blocking."""
+        # Stat first, so a write landing during the read triggers another reload
+        mtime = os.stat(self.input_data_path).st_mtime_ns
+        self.contributors = csv_to_df(self.input_data_path)
+        self.store_mtime = mtime
+
+
+    async def load_store(self) -> bool:
+        """Reads the contributor data off the event loop. Returns False on failure."""
+        t0 = time.perf_counter()
+        try:
+            await asyncio.to_thread(self.read_store)
+        except Exception as e:
+            log(f"COULD NOT LOAD CONTRIBUTOR DATA FROM {self.input_data_path}: {e}")
+            return False
+        log(
+            f"CONTRIBUTOR DATA LOADED IN {time.perf_counter()-t0:.3f}s"
+            f" ({len(self.contributors)} ROWS, {time.perf_counter()-self.t_init:.3f}s AFTER START)"
+        )
+        return True
+
+
+    async def warm_store(self) -> None:
+        """Initial load at startup. Resolves store_ready whether it worked or not."""
+        loaded = False
+        try:
+            loaded = await self.load_store()
+        finally:
+            # Also on cancellation, so nobody waits on store_ready forever
+            if not self.store_ready.done():
+                self.store_ready.set_result(loaded)
+
+
+    async def sync_store(self) -> bool:
+        """
+        Makes sure the in-memory data matches the file before it's written to,
+        so edits made to the file while the bot runs aren't overwritten.
+        Retries a failed startup load. Call with store_lock held.
+        """
+        if not self.store_ready.done():
+            if self.debug_mode:
+                log("CONTRIBUTOR DATA NOT LOADED YET. WAITING.")
+            await asyncio.shield(self.store_ready)
+
+        try:
+            mtime = os.stat(self.input_data_path).st_mtime_ns
+        except OSError as e:
+            log(f"COULD NOT ACCESS {self.input_data_path}: {e}")
+            return False
+
+        if self.contributors is None or mtime != self.store_mtime:
+            if self.debug_mode:
+                log(f"{self.input_data_path} CHANGED ON DISK OR NOT LOADED. RELOADING.")
+            return await self.load_store()
+
+        return True
+
+
+    async def write_store(self) -> None:
+        """Writes the contributor data back to its file. Call with store_lock held."""
+        await asyncio.to_thread(df_to_csv, self.contributors, self.input_data_path)
+        self.store_mtime = os.stat(self.input_data_path).st_mtime_ns
+
+
+    async def recalculate_points(self, context) -> None:
+        """Background job: rescores raw contribution exports & updates changed rows."""
+        import points    # Pulls in pandas, so it's kept out of startup
+
+        t_start = time.perf_counter()
+
+        # Errors are logged here, so the job keeps running on its schedule
+        try:
+            scores, timings = await asyncio.to_thread(points.score_exports, self.export_dir)
+
+            async with self.store_lock:
+                if not await self.sync_store():
+                    log("CONTRIBUTOR DATA UNAVAILABLE. SKIPPING POINTS RECALCULATION.")
+                    return
+
+                t0 = time.perf_counter()
+                changed = await asyncio.to_thread(
+                    points.apply_scores, self.contributors, scores, self.oauth.handle_cols()
+                )
+                timings["merge"] = time.perf_counter() - t0
+
+                if changed:
+                    t0 = time.perf_counter()
+                    await self.write_store()
+                    timings["write"] = time.perf_counter() - t0
+
+        except Exception as e:
+            log(f"POINTS RECALCULATION FAILED: {e!r}")
+            return
+
+        timings["total"] = time.perf_counter() - t_start
+        self.points_timings = timings
+        log(
+            f"POINTS RECALCULATED: {changed} ROWS CHANGED\n"
+            + "\n".join(f"{stage:6} | {secs:.3f}s" for stage, secs in timings.items())
+        )
+
+
+    async def post_init(self, application) -> None:
+        """Runs once the application is initialized, right before polling starts."""
+        loop = asyncio.get_running_loop()
+        self.store_ready = loop.create_future()
+        self.store_lock = asyncio.Lock()
+
+        if self.fast_start:
+            self.warm_task = asyncio.create_task(self.warm_store())
+        else:
+            await self.warm_store()
+
+        log(f"READY TO POLL AFTER {time.perf_counter()-self.t_init:.3f}s")
+
+
+    async def post_shutdown(self, application) -> None:
+        """Runs once the application has shut down. Stops a still running store load."""
+        if self.warm_task is not None and not self.warm_task.done():
+            self.warm_task.cancel()
+        if self.warm_task is not None:
+            try:
+                await self.warm_task
+            except asyncio.CancelledError:
+                pass
+
 
     async def csv(self, update, context) -> None:
         """Returns csv containing only wallet <-> total points pairs."""
@@ -98,25 +287,29 @@ class TelegramBot:
 
         # Case: /start command resulting from oauth deep link
         if context.args not in ([], None):
-            auth_code = context.args
-
-            if self.debug_mode:
-                log("start_wrapper() context.args:", context.args)
-
-            if user_data["choice"] == "discord auth":
-
+            payload = context.args[0]
+            context.args = []    # Delete received Oauth code from context object
+            try:
+                provider, auth_code, code_verifier = self.oauth.resolve(payload, update.effective_user.id)
+
+            except InvalidState as e:
+                # Expired links are an honest mistake, forged/foreign ones aren't
+                if not e.expired:
+                    self.limiter.penalize(update.effective_user.id)
                 if self.debug_mode:
-                    log(f"choice: {user_data['choice']}. Calling self.discord_oauth_get_data(auth_code, update, context)")
-
-                return await self.discord_oauth_get_data(auth_code, update, context)
-        
-            if user_data["choice"] == "twitter auth":
+                    log(f"start_wrapper(): COULD NOT VERIFY OAUTH STATE IN {payload}: {e}")
 
-                if self.debug_mode:
-                    log(f"choice: {user_data['choice']}. Calling self.twitter_oauth_get_data(auth_code, update, context)")
+                await self.send_msg(
+                    "This login link has expired or wasn't meant for you."
+                    f" Please authenticate your {self.oauth.commands()} handle again.",
+                    update
+                )
+                return self.CHOOSING
 
-                    return await self.twitter_oauth_get_data(auth_code, update, context)
+            if self.debug_mode:
+                log(f"start_wrapper(): Calling self.oauth_get_data() for {provider.name}")
 
+            return await self.oauth_get_data(provider, auth_code, code_verifier, update, context)
 
         # Case: Typical /start command press
         else:
@@ -184,7 +377,7 @@ class TelegramBot:
                     f"Couldn't find {text} on Starknet."
                     " Please make sure the entered wallet is correct."
                     " You'll have to authenticate again to start over."
-                    " Please choose to verify your /discord or /twitter"
+                    f" Please choose to verify your {self.oauth.commands()}"
                     " handle."
                 )
 
@@ -207,6 +400,15 @@ class TelegramBot:
                 # Add wallet information to data
                 success = await self.add_wallet_to_data(wallet, platform, handle, update, context)
 
+                # Store unavailable -> Stay in TYPING_REPLY, so the wallet can be sent again
+                if success is None:
+                    await self.send_msg(
+                        "Sorry, the contributor records can't be accessed right now."
+                        " Please send your wallet again in a few minutes.",
+                        update
+                    )
+                    return self.TYPING_REPLY
+
                 if success:
 
                     reply_text = (
@@ -215,6 +417,7 @@ class TelegramBot:
                 )
 
                 else:
+                    self.limiter.penalize(update.effective_user.id)
                     reply_text = (
                         f"No records have been found for the {platform} handle {handle}."
                     )
@@ -231,48 +434,47 @@ class TelegramBot:
 
     async def add_wallet_to_data(self, wallet, platform, handle, update, context) -> bool:
         """
-        Add wallet information to row in data.
+        Add wallet information to row in data. Returns False if no row matches
+        the handle & None if the contributor data can't be loaded.
         """
 
-        df = csv_to_df(self.input_data_path)
+        target_col = self.oauth.providers[platform].handle_col
 
-        if platform == "discord":
-            target_col = "Discord UserName"
-        if platform == "twitter":
-            target_col = "Twitter Username"
+        async with self.store_lock:
+            # Early submissions wait here until the contributor store is warm
+            if not await self.sync_store():
+                return None
+            df = self.contributors
 
-        # Add wallet info
-        df.loc[df[target_col] == handle, "Wallet"] = wallet
-        if self.debug_mode:
-            log(f"ADDED {wallet} TO DF READ FROM {self.input_data_path}.\n")
+            # Add wallet info
+            rows = df[target_col] == handle
+            if not rows.any():
+                return False
+            df.loc[rows, "Wallet"] = wallet
+            if self.debug_mode:
+                log(f"ADDED {wallet} TO DF READ FROM {self.input_data_path}.\n")
 
-        # Update data file
-        df_to_csv(df, self.input_data_path)
-        if self.debug_mode:
-            log(f"UPDATED {self.input_data_path} WITH UPDATED DF.\n")
+            # Update data file
+            await self.write_store()
+            if self.debug_mode:
+                log(f"UPDATED {self.input_data_path} WITH UPDATED DF.\n")
 
-            return True
+        return True
 
 
-    async def authenticate_discord(self, update, context) -> None:
+    async def authenticate(self, update, context, name) -> None:
         """
-        Redirect user to OAuth2 verification page. Result can be fetched
-        from inline callback data.
+        Redirect user to the provider's OAuth2 verification page. The signed
+        state in the deep link leads back to the provider in start_wrapper().
         """
         user_data = context.user_data
-        user_data["choice"] = "discord auth"
+        user_data["choice"] = f"{name} auth"
 
-        def build_oauth_link():
-            client_id = os.getenv("OAUTH_DISCORD_CLIENT_ID")
-            redirect_uri = os.getenv("OAUTH_REDIRECT_URI")
-            scope = "identify"
-            discord_login_url = f"https://discordapp.com/api/oauth2/authorize?client_id={client_id}&redirect_uri={redirect_uri}&response_type=code&scope={scope}"
-            return discord_login_url
-
-        oauth_link = build_oauth_link()
+        label = self.oauth.providers[name].label
+        oauth_link = self.oauth.login_url(name, update.effective_user.id)
 
         msg = (
-            f"Please follow this [link]({oauth_link}) to login with Discord,"
+            f"Please follow this [link]({oauth_link}) to login with {label},"
             f" then hit the start that'll appear once you get redirected back.\n\n"
             f" (For mobile users: Due to a [bug](https://github.com/TelegramMessenger/Telegram-iOS/issues/1100) in the recent"
             f" Telegram app release, you may have to first open the [link]({oauth_link}) in an external browser,"
@@ -290,188 +492,50 @@ class TelegramBot:
         return
 
 
-    async def authenticate_twitter(self, update, context) -> None:
-        """
-        Redirect user to OAuth2 verification page. Result can be fetched
-        from inline callback data.
-        """
-        user_data = context.user_data
-        user_data["choice"] = "twitter auth"
-
-        def build_oauth_link():
-            client_id = os.getenv("OAUTH_TWITTER_CLIENT_ID")
-            redirect_uri = os.getenv("OAUTH_REDIRECT_URI")
-            scope = "users.read%20tweet.read%20offline.access"
-            twitter_login_url = f"https://twitter.com/i/oauth2/authorize?response_type=code&client_id={client_id}&redirect_uri={redirect_uri}&scope={scope}&state=state&code_challenge=challenge&code_challenge_method=plain"
-        
+    async def authenticate_discord(self, update, context) -> None:
+        """Start the OAuth2 flow for Discord."""
+        return await self.authenticate(update, context, "discord")
 
-            return twitter_login_url
 
-        oauth_link = build_oauth_link()
+    async def authenticate_twitter(self, update, context) -> None:
+        """Start the OAuth2 flow for Twitter."""
+        return await self.authenticate(update, context, "twitter")
 
-        msg = (
-            f"Please follow this [link]({oauth_link}) to login with Twitter,"
-            f" then hit the start that'll appear once you get redirected back.\n\n"
-            f" (For mobile users: Due to a [bug](https://github.com/TelegramMessenger/Telegram-iOS/issues/1100) in the recent"
-            f" Telegram app release, you may have to first open the [link]({oauth_link}) in an external browser,"
-            f" then switch back to the Telegram app, close it temporarily, return to the browser and "
-            f" only then hit 'Open in Telegram', so that the app gets started by the redirect.)"
-        )
 
-        await self.send_msg(
-            msg,
-            update,
-            disable_web_page_preview=True,
-            parse_mode="Markdown",
-            )
+    async def oauth_get_data(self, provider, auth_code, code_verifier, update, context) -> int:
+        """Queries the provider's API using received auth_code for user name."""
 
-        return
+        try:
+            complete_name = await asyncio.to_thread(provider.fetch_username, auth_code, code_verifier)
 
-
-    async def discord_oauth_get_data(self, auth_code, update, context) -> None:
-        """Queries Discord API using received auth_code for user name."""
-
-        context.args = []    # Delete received Oauth code from context object
-
-        def build_oauth_obj():
-            d = {}
-            d["client_id"] = os.getenv("OAUTH_DISCORD_CLIENT_ID")
-            d["client_secret"] = os.getenv("OAUTH_DISCORD_CLIENT_SECRET")
-            d["redirect_uri"] = os.getenv("OAUTH_REDIRECT_URI")
-            d["scope"] = 'identify'
-            d["discord_login_url"] = f'https://discordapp.com/api/oauth2/authorize?client_id={d["client_id"]}&redirect_uri={d["redirect_uri"]}&response_type=code&scope={d["scope"]}'
-            d["discord_token_url"] = 'https://discordapp.com/api/oauth2/token'
-            d["discord_api_url"] = 'https://discordapp.com/api'
-            return d
-
-        def get_accesstoken(auth_code, oauth):
-            payload = {
-                "client_id": oauth["client_id"],
-                "client_secret": oauth["client_secret"],
-                "grant_type": "authorization_code",
-                "code": auth_code,
-                "redirect_uri": oauth["redirect_uri"],
-                "scope": oauth["scope"]
-            }
-
-            headers = {
-                "Content-Type": "application/x-www-form-urlencoded"
-            }
-
-            access_token = requests.post(
-                url = oauth["discord_token_url"],
-                data=payload,
-                headers=headers
+        # Outage on the provider's side -> No cooldown, the user did nothing wrong
+        except ProviderUnavailable:
+            await self.send_msg(
+                f"Sorry, {provider.label} can't be reached right now."
+                f" Please try again in a few minutes via {self.oauth.commands()}.",
+                update
             )
+            return self.CHOOSING
 
-            json = access_token.json()
-            return json.get("access_token")
-
-        def get_userjson(access_token, oauth):
-            url = oauth["discord_api_url"]+'/users/@me'
-            headers = {"Authorization": f"Bearer {access_token}"}
-            user_obj = requests.get(url=url, headers=headers)
-            user_json = user_obj.json()
-            return user_json
-
-        oauth = build_oauth_obj()
-        access_token = get_accesstoken(auth_code, oauth)
-        user_json = get_userjson(access_token, oauth)
-
-        username = user_json.get('username')
-        discriminator = user_json.get('discriminator')
-        #user_id = user_json.get('id')
-
-        if discriminator in (None, 0, '0'):
-            complete_name = str(username)
-        else:
-            complete_name = str(username)+"#"+str(discriminator)
-
-        # Store handle in bot user data
-        context.user_data["handle"] = complete_name
-        context.user_data["platform"] = "discord"
-
-        if self.debug_mode:
-            log(f"GOT DISCORD OAUTH INFO: {complete_name} ")
-
-        reply_msg = (
-            f"Success! {complete_name} verified!"
-            " Time to enter your wallet information!"
-        )
-
-        await self.send_msg(reply_msg, update)
-        await asyncio.sleep(1.5)
-        return await self.add_wallet(update, context, platform="discord", handle=complete_name)
-
-
-    async def twitter_oauth_get_data(self, auth_code, update, context) -> None:
-        """Queries Twitter API using received auth_code for user name."""
-
-        context.args = []    # Delete received Oauth code from context object
-
-        def build_oauth_obj():
-            d = {}
-            d["client_id"] = os.getenv("OAUTH_TWITTER_CLIENT_ID")
-            d["client_secret"] = os.getenv("OAUTH_TWITTER_CLIENT_SECRET")
-            d["redirect_uri"] = os.getenv("OAUTH_REDIRECT_URI")
-            d["scope"] = 'identify'
-            
-            d["twitter_login_url"] = f'https://api.twitter.com/oauth2/authorize?client_id={d["client_id"]}&redirect_uri={d["redirect_uri"]}&response_type=code&scope={d["scope"]}'
-            d["twitter_token_url"] = 'https://api.twitter.com/oauth2/token'
-            d["twitter_api_url"] = 'https://api.twitter.com'
-            return d
+        # Code rejected by the provider
+        if complete_name is None:
+            self.limiter.penalize(update.effective_user.id)
+            if self.debug_mode:
+                log(f"COULD NOT GET {provider.name.upper()} OAUTH INFO.")
 
-        def get_accesstoken(auth_code, oauth):
-            
-            payload = {
-                "client_id": oauth["client_id"],
-                "client_secret": oauth["client_secret"],
-                "grant_type": "authorization_code",
-                "code": auth_code,
-                "redirect_uri": oauth["redirect_uri"],
-                "scope": oauth["scope"]
-            }
-            
-            
-            headers = {
-                "Content-Type": "application/x-www-form-urlencoded"
-            }
-
-            access_token = requests.post(
-                url = oauth["twitter_token_url"],
-                data=payload,
-                headers=headers
+            await self.send_msg(
+                f"Sorry, {provider.label} didn't confirm your login."
+                f" Please try again via {self.oauth.commands()}.",
+                update
             )
-
-            json = access_token.json()
-            return json.get("access_token")
-
-        def get_userjson(access_token, oauth):
-            url = oauth["twitter_api_url"]+'/users/@me'
-            headers = {"Authorization": f"Bearer {access_token}"}
-            user_obj = requests.get(url=url, headers=headers)
-            user_json = user_obj.json()
-            return user_json
-
-        oauth = build_oauth_obj()
-        access_token = get_accesstoken(auth_code, oauth)
-        user_json = get_userjson(access_token, oauth)
-
-        username = user_json.get('username')
-        discriminator = user_json.get('discriminator')
-        #user_id = user_json.get('id')
-
-        if discriminator in (None, 0, '0'):
-            complete_name = str(username)
-        else:
-            complete_name = str(username)+"#"+str(discriminator)
+            return self.CHOOSING
 
         # Store handle in bot user data
         context.user_data["handle"] = complete_name
-        context.user_data["platform"] = "twitter"
+        context.user_data["platform"] = provider.name
 
         if self.debug_mode:
-            log(f"GOT TWITTER OAUTH INFO: {complete_name} ")
+            log(f"GOT {provider.name.upper()} OAUTH INFO: {complete_name} ")
 
         reply_msg = (
             f"Success! {complete_name} verified!"
@@ -479,8 +543,8 @@ class TelegramBot:
         )
 
         await self.send_msg(reply_msg, update)
-        await asyncio.sleep(1.5)
-        return await self.add_wallet(update, context, platform="twitter", handle=complete_name)
+        await asyncio.sleep(self.reply_delay)
+        return await self.add_wallet(update, context, platform=provider.name, handle=complete_name)
 
 
     async def add_wallet(self, update, context, platform, handle) -> int:
@@ -549,8 +613,11 @@ class TelegramBot:
         return ConversationHandler.END
 
 
-    def run(self) -> None:
-        """Run the bot with all handlers as defined."""
+    def build(self, token=None, request=None) -> Application:
+        """
+        Build the application with all handlers as defined. A custom request
+        object (e.g. tests/fakes.py) replaces the connection to Telegram.
+        """
 
         # Some config for the application
         config = PersistenceInput(
@@ -565,10 +632,17 @@ class TelegramBot:
             update_interval=30
         )
         # Create the application and pass it your bot's token.
-        token = os.environ["TELEGRAM_BOT_TOKEN"]
-        self.application = (
-            Application.builder().token(token).persistence(persistence).build()
+        token = token or os.environ["TELEGRAM_BOT_TOKEN"]
+        builder = (
+            Application.builder()
+            .token(token)
+            .persistence(persistence)
+            .post_init(self.post_init)
+            .post_shutdown(self.post_shutdown)
         )
+        if request is not None:
+            builder = builder.request(request).get_updates_request(request)
+        self.application = builder.build()
 
         # Define conversation handler with the states CHOOSING and TYPING_REPLY
         conv_handler = ConversationHandler(
@@ -626,6 +700,20 @@ class TelegramBot:
             persistent=False,
         )
 
+        # Schedule the points recalculation (needs python-telegram-bot[job-queue])
+        if self.application.job_queue is None:
+            log("NO JOB QUEUE AVAILABLE. POINTS WON'T BE RECALCULATED.")
+        else:
+            self.application.job_queue.run_repeating(
+                self.recalculate_points,
+                interval=self.recalc_interval,
+                first=60,
+                name="recalculate_points"
+            )
+
+        # Admission control runs first & stops rejected updates from going further
+        self.application.add_handler(TypeHandler(Update, self.admission_control), group=-1)
+
         # Add additional handlers
         self.application.add_handler(conv_handler)
 
@@ -641,6 +729,10 @@ class TelegramBot:
         self.application.add_handler(show_source_handler)
         self.application.add_handler(csv_handler)
 
-        # Run application
-        log("TEST LOGGING")
+        return self.application
+
+
+    def run(self) -> None:
+        """Run the bot with all handlers as defined."""
+        self.build()
         self.application.run_polling()
@@ -0,0 +1,72 @@
+import os, sys
+import pytest
+
+# The bot's modules live in the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helpers import df_to_csv
+from fakes import FakeBotAPI, FakeOAuthServer
+
+# Discord users dc<i> & Twitter users tw<i> log in with auth code code<i>
+USERS = {
+    "discord": {f"code{i}": {"id": str(i), "username": f"dc{i}", "discriminator": "0"} for i in range(20)},
+    "twitter": {f"code{i}": {"data": {"id": str(i), "username": f"tw{i}"}} for i in range(20)},
+}
+
+
+@pytest.fixture
+def make_oauth_server(monkeypatch):
+    """Returns a factory for FakeOAuthServers serving USERS, patched into requests."""
+    monkeypatch.setenv("OAUTH_STATE_SECRET", "test-secret")
+    monkeypatch.setenv("OAUTH_REDIRECT_URI", "https://example.com/redirect")
+    for name in USERS:
+        monkeypatch.setenv(f"OAUTH_{name.upper()}_CLIENT_ID", f"{name}-id")
+        monkeypatch.setenv(f"OAUTH_{name.upper()}_CLIENT_SECRET", f"{name}-secret")
+
+    def make(**kwargs):
+        server = FakeOAuthServer(USERS, **kwargs)
+        server.install(monkeypatch)
+        return server
+
+    return make
+
+
+@pytest.fixture
+def make_bot(tmp_path, monkeypatch, make_oauth_server):
+    """
+    Returns a factory for (TelegramBot, FakeBotAPI, FakeOAuthServer) triples
+    working on a contributor file in tmp_path. Keyword arguments not listed go
+    to the FakeOAuthServer.
+    """
+    import pandas as pd
+    from telegram_bot import TelegramBot
+
+    monkeypatch.chdir(tmp_path)
+
+    def write_data():
+        """Contributors dc<i> / tw<i> for i in 0..19, no wallets yet."""
+        df = pd.DataFrame({
+            "Discord UserName": [f"dc{i}" for i in range(20)],
+            "Twitter Username": [f"tw{i}" for i in range(20)],
+            "Wallet": [""] * 20,
+            "Total Contribution Points": range(20),
+        })
+        df_to_csv(df, tmp_path / "input_data.csv")
+
+    def make(write=True, api_latency=0, fast_start=False, **server_kwargs):
+        if write:
+            write_data()
+
+        server = make_oauth_server(**server_kwargs)
+        bot = TelegramBot(fast_start=fast_start)
+        bot.data_path = str(tmp_path / "data")
+        bot.input_data_path = str(tmp_path / "input_data.csv")
+        bot.export_dir = str(tmp_path / "contributions")
+        bot.reply_delay = 0
+
+        api = FakeBotAPI(latency=api_latency)
+        bot.build(token="123:fake", request=api)
+        return bot, api, server
+
+    make.write_data = write_data
+    return make
@@ -0,0 +1,253 @@
+'''
+This file contains local stand-ins for the Telegram Bot API & the OAuth
+providers' HTTP endpoints, so that whole conversations can be driven
+in-process without network access. Both accept injectable latency & failure
+rates. The real OAuthProvider objects run against the fake endpoints. Usage:
+
+    server = FakeOAuthServer({"discord": {"code1": {"username": "alice"}}})
+    server.install(monkeypatch)
+    api = FakeBotAPI()
+    bot = TelegramBot()
+    async with running(bot.build(token="123:fake", request=api)):
+        await api.send_text(42, "/discord")
+        await api.wait_for_reply(42)
+        await api.send_text(42, f"/start {oauth_payload(api.replies(42)[-1], 'code1')}")
+'''
+
+import re, json, time, random, asyncio, requests
+from contextlib import asynccontextmanager
+from telegram.request import BaseRequest
+from oauth_providers import default_providers
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+
+
+class FakeResponse:
+    """The parts of requests.Response that OAuthProvider uses."""
+
+    def __init__(self, url, status_code, body):
+        self.url = url
+        self.status_code = status_code
+        self.text = body if isinstance(body, str) else json.dumps(body)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeOAuthServer:
+    """
+    Token & user endpoints of the default providers. users maps provider name
+    -> auth code -> the JSON its user endpoint returns. Outages come in the
+    kinds "connection", "timeout", "garbage" (no JSON) & "server_error".
+    """
+
+    def __init__(self, users, latency=0, reject_rate=0, outage_rate=0, outage="connection", seed=0):
+        self.users = users
+        self.latency = latency
+        # Share of codes rejected / of requests hit by an outage
+        self.reject_rate = reject_rate
+        self.outage_rate = outage_rate
+        self.outage = outage
+        self.random = random.Random(seed)
+        providers = default_providers()
+        self.token_urls = {p.token_url: p.name for p in providers}
+        self.user_urls = {p.user_url: p.name for p in providers}
+        # access token -> user JSON
+        self.tokens = {}
+        # (method, url, keyword arguments) of every request, in order
+        self.requests = []
+
+
+    def install(self, monkeypatch) -> None:
+        monkeypatch.setattr(requests, "post", self.post)
+        monkeypatch.setattr(requests, "get", self.get)
+
+
+    def token_requests(self, name) -> list:
+        return [kwargs for method, url, kwargs in self.requests
+                if method == "POST" and self.token_urls.get(url) == name]
+
+
+    def disturb(self, url):
+        """Waits for the injected latency & maybe simulates an outage."""
+        time.sleep(self.latency)
+        if self.random.random() >= self.outage_rate:
+            return None
+        if self.outage == "connection":
+            raise requests.ConnectionError("Injected connection error")
+        if self.outage == "timeout":
+            raise requests.Timeout("Injected timeout")
+        if self.outage == "garbage":
+            return FakeResponse(url, 200, "<html>Something went wrong</html>")
+        return FakeResponse(url, 503, "<html>Service Unavailable</html>")
+
+
+    def post(self, url, data=None, headers=None, auth=None, timeout=None):
+        self.requests.append(("POST", url, {"data": data, "headers": headers, "auth": auth}))
+        failed = self.disturb(url)
+        if failed:
+            return failed
+
+        name = self.token_urls[url]
+        user_json = self.users.get(name, {}).get(data["code"])
+        if user_json is None or self.random.random() < self.reject_rate:
+            return FakeResponse(url, 400, {"error": "invalid_grant"})
+
+        access_token = f"{name}-{len(self.requests)}"
+        self.tokens[access_token] = user_json
+        return FakeResponse(url, 200, {"access_token": access_token, "token_type": "bearer"})
+
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(("GET", url, {"headers": headers}))
+        failed = self.disturb(url)
+        if failed:
+            return failed
+
+        access_token = headers["Authorization"].split(" ", 1)[1]
+        if url not in self.user_urls or access_token not in self.tokens:
+            return FakeResponse(url, 401, {"message": "401: Unauthorized"})
+        return FakeResponse(url, 200, self.tokens[access_token])
+
+
+class FakeBotAPI(BaseRequest):
+    """
+    In-process Telegram Bot API. Updates are fed in with send_text() and handed
+    out via getUpdates. Sent messages are recorded per chat with a timestamp.
+    """
+
+    def __init__(self, latency=0, fail_rate=0, seed=0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.updates = []
+        self.update_id = 0
+        self.message_id = 0
+        self.new_update = None
+        # chat_id -> [(monotonic time, text)]
+        self.sent = {}
+        # chat_id -> monotonic time of the last incoming message
+        self.received_at = {}
+
+
+    async def initialize(self) -> None:
+        if self.new_update is None:
+            self.new_update = asyncio.Event()
+
+
+    async def shutdown(self) -> None:
+        pass
+
+
+    @property
+    def read_timeout(self):
+        return None
+
+
+    async def do_request(self, url, method, request_data=None, **timeouts):
+        endpoint = url.rsplit("/", 1)[-1]
+        params = request_data.parameters if request_data else {}
+
+        if endpoint != "getUpdates":
+            await asyncio.sleep(self.latency)
+            if self.random.random() < self.fail_rate:
+                return 500, json.dumps({"ok": False, "description": "Injected failure"}).encode()
+
+        if endpoint == "getMe":
+            result = BOT_USER
+        elif endpoint == "getUpdates":
+            result = await self.get_updates(params.get("offset") or 0, params.get("timeout") or 0)
+        elif endpoint == "sendMessage":
+            result = self.record(params["chat_id"], params["text"])
+        else:
+            result = True
+
+        return 200, json.dumps({"ok": True, "result": result}).encode()
+
+
+    async def get_updates(self, offset, timeout) -> list:
+        self.updates = [u for u in self.updates if u["update_id"] >= offset]
+        if not self.updates:
+            self.new_update.clear()
+            try:
+                await asyncio.wait_for(self.new_update.wait(), min(timeout, 1))
+            except asyncio.TimeoutError:
+                pass
+        return self.updates
+
+
+    def record(self, chat_id, text) -> dict:
+        chat_id = int(chat_id)
+        self.message_id += 1
+        self.sent.setdefault(chat_id, []).append((time.monotonic(), text))
+        return {
+            "message_id": self.message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+            "text": text,
+        }
+
+
+    async def send_text(self, user_id, text) -> None:
+        """Queues a private message from user_id, as if typed in Telegram."""
+        self.update_id += 1
+        self.message_id += 1
+        message = {
+            "message_id": self.message_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+            "text": text,
+        }
+        if text.startswith("/"):
+            command = text.split(" ", 1)[0]
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+
+        self.received_at[user_id] = time.monotonic()
+        self.updates.append({"update_id": self.update_id, "message": message})
+        self.new_update.set()
+
+
+    def replies(self, chat_id) -> list:
+        return [text for _, text in self.sent.get(chat_id, [])]
+
+
+    async def wait_for_reply(self, chat_id, count=1, timeout=5) -> float:
+        """
+        Waits until chat_id got count replies to its last message. Returns the
+        seconds between that message & the last of those replies.
+        """
+        since = self.received_at[chat_id]
+        deadline = time.monotonic() + timeout
+        while True:
+            new = [t for t, _ in self.sent.get(chat_id, []) if t >= since]
+            if len(new) >= count:
+                return new[count-1] - since
+            if time.monotonic() > deadline:
+                raise asyncio.TimeoutError(f"{chat_id} got {len(new)}/{count} replies")
+            await asyncio.sleep(0.01)
+
+
+def oauth_payload(login_msg, auth_code) -> str:
+    """Deep link payload the OAuth redirect would produce for a login message."""
+    state = re.search(r"[?&]state=([\w-]+)", login_msg).group(1)
+    return state + auth_code
+
+
+@asynccontextmanager
+async def running(application):
+    """Runs application (as returned by TelegramBot.build()) for the duration of the block."""
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    await application.start()
+    await application.updater.start_polling(poll_interval=0, timeout=1)
+    try:
+        yield application
+    finally:
+        await application.updater.stop()
+        await application.stop()
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
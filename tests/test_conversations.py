@@ -0,0 +1,255 @@
+import time, asyncio, hashlib
+import pytest
+from urllib.parse import urlparse, parse_qs
+from helpers import csv_to_df
+from oauth_providers import b64url
+from fakes import running, oauth_payload
+
+WALLET = "0x0123456789abcdef"
+
+
+def wallet_of(bot, col, handle):
+    df = csv_to_df(bot.input_data_path)
+    return df.loc[df[col] == handle, "Wallet"].iloc[0]
+
+
+async def login(api, user_id, platform, code):
+    """/discord or /twitter, then the deep link the OAuth redirect leads to."""
+    await api.send_text(user_id, f"/{platform}")
+    await api.wait_for_reply(user_id)
+    await api.send_text(user_id, f"/start {oauth_payload(api.replies(user_id)[-1], code)}")
+    # Handle confirmed + wallet prompt
+    return await api.wait_for_reply(user_id, count=2)
+
+
+async def add_wallet(api, user_id, wallet=WALLET):
+    await api.send_text(user_id, wallet)
+    # Success message + menu hint
+    await api.wait_for_reply(user_id, count=2)
+
+
+def test_discord_conversation(make_bot):
+    bot, api, server = make_bot()
+
+    async def scenario():
+        async with running(bot.application):
+            await login(api, 7, "discord", "code3")
+            assert "dc3 verified" in api.replies(7)[-2]
+            await add_wallet(api, 7)
+
+    asyncio.run(scenario())
+    assert "Success!" in api.replies(7)[-2]
+    assert wallet_of(bot, "Discord UserName", "dc3") == WALLET
+
+    # Discord takes the client secret in the form data
+    token_request, = server.token_requests("discord")
+    assert token_request["auth"] is None
+    assert token_request["data"] == {
+        "client_id": "discord-id",
+        "client_secret": "discord-secret",
+        "grant_type": "authorization_code",
+        "code": "code3",
+        "redirect_uri": "https://example.com/redirect",
+    }
+
+
+def test_twitter_conversation(make_bot):
+    # The Twitter deep link used to end without a reply outside of debug mode
+    bot, api, server = make_bot()
+
+    async def scenario():
+        async with running(bot.application):
+            await login(api, 8, "twitter", "code4")
+            assert "tw4 verified" in api.replies(8)[-2]
+            await add_wallet(api, 8)
+
+    asyncio.run(scenario())
+    assert wallet_of(bot, "Twitter Username", "tw4") == WALLET
+
+    # Twitter takes the client secret via basic auth
+    token_request, = server.token_requests("twitter")
+    assert token_request["auth"] == ("twitter-id", "twitter-secret")
+    assert "client_secret" not in token_request["data"]
+    assert token_request["data"]["code"] == "code4"
+
+    # PKCE: the verifier sent with the token request matches the challenge in the link
+    link = api.replies(8)[0].split("](", 1)[1].split(")", 1)[0]
+    challenge = parse_qs(urlparse(link).query)["code_challenge"][0]
+    verifier = token_request["data"]["code_verifier"]
+    assert b64url(hashlib.sha256(verifier.encode()).digest()) == challenge
+
+
+def test_invalid_and_foreign_state(make_bot):
+    bot, api, server = make_bot()
+
+    async def scenario():
+        async with running(bot.application):
+            await api.send_text(1, "/start tAAAAAAAAAAAAAAAAcode1")
+            await api.wait_for_reply(1)
+            assert "wasn't meant for you" in api.replies(1)[-1]
+
+            # User 2 tries to use a login link issued to user 3
+            await api.send_text(3, "/discord")
+            await api.wait_for_reply(3)
+            await api.send_text(2, f"/start {oauth_payload(api.replies(3)[-1], 'code2')}")
+            await api.wait_for_reply(2)
+            assert "wasn't meant for you" in api.replies(2)[-1]
+
+            # Both are locked out for a while
+            await api.send_text(2, "/start")
+            await api.wait_for_reply(2)
+            assert "wait a moment" in api.replies(2)[-1]
+
+    asyncio.run(scenario())
+    assert server.requests == []
+
+
+def test_expired_state_has_no_cooldown(make_bot):
+    bot, api, server = make_bot()
+
+    async def scenario():
+        async with running(bot.application):
+            await api.send_text(1, "/discord")
+            await api.wait_for_reply(1)
+            bot.oauth.ttl = -1
+            await api.send_text(1, f"/start {oauth_payload(api.replies(1)[-1], 'code1')}")
+            await api.wait_for_reply(1)
+            assert "expired" in api.replies(1)[-1]
+
+            await api.send_text(1, "/start")
+            await api.wait_for_reply(1)
+            assert "Have you contributed" in api.replies(1)[-1]
+
+    asyncio.run(scenario())
+
+
+def test_oauth_code_rejected(make_bot):
+    bot, api, server = make_bot(reject_rate=1)
+
+    async def scenario():
+        async with running(bot.application):
+            await api.send_text(1, "/discord")
+            await api.wait_for_reply(1)
+            await api.send_text(1, f"/start {oauth_payload(api.replies(1)[-1], 'code1')}")
+            await api.wait_for_reply(1)
+            assert "didn't confirm your login" in api.replies(1)[-1]
+
+            await api.send_text(1, "/discord")
+            await api.wait_for_reply(1)
+            assert "wait a moment" in api.replies(1)[-1]
+
+    asyncio.run(scenario())
+    assert len(server.token_requests("discord")) == 1
+
+
+@pytest.mark.parametrize("outage", ["connection", "timeout", "garbage", "server_error"])
+def test_provider_outage_has_no_cooldown(make_bot, outage):
+    bot, api, server = make_bot(outage_rate=1, outage=outage)
+
+    async def scenario():
+        async with running(bot.application):
+            await api.send_text(1, "/discord")
+            await api.wait_for_reply(1)
+            await api.send_text(1, f"/start {oauth_payload(api.replies(1)[-1], 'code1')}")
+            await api.wait_for_reply(1)
+            assert "can't be reached" in api.replies(1)[-1]
+
+            await api.send_text(1, "/discord")
+            await api.wait_for_reply(1)
+            assert "login with Discord" in api.replies(1)[-1]
+
+    asyncio.run(scenario())
+
+
+def test_store_unavailable_then_recovers(make_bot):
+    bot, api, server = make_bot(write=False)
+
+    async def scenario():
+        async with running(bot.application):
+            await login(api, 5, "discord", "code5")
+            await api.send_text(5, WALLET)
+            await api.wait_for_reply(5)
+            assert "can't be accessed" in api.replies(5)[-1]
+
+            # The file shows up, the wallet gets sent again in the same conversation
+            make_bot.write_data()
+            await add_wallet(api, 5)
+
+    asyncio.run(scenario())
+    assert wallet_of(bot, "Discord UserName", "dc5") == WALLET
+
+
+def test_concurrent_users(make_bot):
+    n = 10
+    bot, api, server = make_bot(latency=0.05)
+
+    async def conversation(user_id):
+        platform = "discord" if user_id % 2 else "twitter"
+        await login(api, user_id, platform, f"code{user_id}")
+        await add_wallet(api, user_id, wallet=f"0xwallet{user_id}")
+
+    async def scenario():
+        async with running(bot.application):
+            await asyncio.gather(*(conversation(i) for i in range(n)))
+
+    asyncio.run(scenario())
+    df = csv_to_df(bot.input_data_path)
+    for i in range(n):
+        col = "Discord UserName" if i % 2 else "Twitter Username"
+        assert df.loc[df[col] == (f"dc{i}" if i % 2 else f"tw{i}"), "Wallet"].iloc[0] == f"0xwallet{i}"
+
+
+def test_hot_path_latency(make_bot):
+    bot, api, server = make_bot()
+
+    async def scenario():
+        async with running(bot.application):
+            await api.send_text(1, "/start")
+            start_latency = await api.wait_for_reply(1)
+            deep_link_latency = await login(api, 1, "discord", "code1")
+            return start_latency, deep_link_latency
+
+    start_latency, deep_link_latency = asyncio.run(scenario())
+    assert start_latency < 0.5
+    # reply_delay=0, so nothing but handler work sits between code & wallet prompt
+    assert deep_link_latency < 0.5
+
+
+def test_injected_oauth_latency_is_visible(make_bot):
+    bot, api, server = make_bot(latency=0.3)
+
+    async def scenario():
+        async with running(bot.application):
+            return await login(api, 1, "discord", "code1")
+
+    assert asyncio.run(scenario()) >= 0.3
+
+
+def test_fast_start(make_bot):
+    bot, api, server = make_bot(fast_start=True)
+
+    # Slow down the contributor data load
+    read_store = bot.read_store
+    def slow_read_store():
+        time.sleep(0.5)
+        read_store()
+    bot.read_store = slow_read_store
+
+    async def scenario():
+        async with running(bot.application):
+            await api.send_text(1, "/start")
+            start_latency = await api.wait_for_reply(1)
+            assert not bot.store_ready.done()
+
+            # Logging in & entering the wallet don't need to wait for the load
+            await login(api, 1, "discord", "code1")
+            await api.send_text(1, WALLET)
+            assert not bot.store_ready.done()
+            await api.wait_for_reply(1, count=2)
+            assert bot.store_ready.result() is True
+            return start_latency
+
+    assert asyncio.run(scenario()) < 0.3
+    assert "Success!" in api.replies(1)[-2]
+    assert wallet_of(bot, "Discord UserName", "dc1") == WALLET
+    assert bot.warm_task.done()
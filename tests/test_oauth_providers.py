@@ -0,0 +1,74 @@
+import pytest
+from oauth_providers import (
+    OAuthRegistry,
+    OAuthProvider,
+    ProviderUnavailable,
+    default_providers,
+    discord_username,
+    twitter_username,
+)
+
+
+def github():
+    return OAuthProvider(
+        name="github",
+        tag="g",
+        label="GitHub",
+        authorize_url="https://github.com/login/oauth/authorize",
+        token_url="https://github.com/login/oauth/access_token",
+        user_url="https://api.github.com/user",
+        scope="read:user",
+        get_username=lambda user_json: user_json.get("login"),
+        handle_col="GitHub Username",
+    )
+
+
+def test_providers_are_declared_once():
+    registry = OAuthRegistry(default_providers() + [github()], secret="s", env={})
+    assert registry.commands() == "/discord, /twitter or /github"
+    assert registry.handle_cols() == {
+        "discord": "Discord UserName",
+        "twitter": "Twitter Username",
+        "github": "GitHub Username",
+    }
+    assert OAuthRegistry([github()], secret="s", env={}).commands() == "/github"
+
+
+def test_discord_username():
+    assert discord_username({"username": "alice", "discriminator": "0"}) == "alice"
+    assert discord_username({"username": "alice"}) == "alice"
+    assert discord_username({"username": "bob", "discriminator": "1234"}) == "bob#1234"
+    assert discord_username({"message": "401: Unauthorized"}) is None
+
+
+def test_twitter_username():
+    assert twitter_username({"data": {"id": "1", "username": "carol"}}) == "carol"
+    assert twitter_username({"username": "carol"}) is None
+    assert twitter_username({"errors": [{"message": "Unauthorized"}]}) is None
+
+
+def test_fetch_username(make_oauth_server):
+    server = make_oauth_server()
+    server.users["discord"]["legacy"] = {"username": "bob", "discriminator": "1234"}
+    providers = OAuthRegistry().providers
+
+    assert providers["discord"].fetch_username("code1") == "dc1"
+    assert providers["discord"].fetch_username("legacy") == "bob#1234"
+    assert providers["twitter"].fetch_username("code2", "verifier") == "tw2"
+
+    # The access token from the token endpoint is used on the user endpoint
+    method, url, kwargs = server.requests[-1]
+    assert (method, url) == ("GET", "https://api.twitter.com/2/users/me")
+    assert kwargs["headers"]["Authorization"].startswith("Bearer twitter-")
+
+
+def test_fetch_username_code_rejected(make_oauth_server):
+    make_oauth_server()
+    assert OAuthRegistry().providers["discord"].fetch_username("unknown") is None
+
+
+@pytest.mark.parametrize("outage", ["connection", "timeout", "garbage", "server_error"])
+def test_fetch_username_provider_unavailable(make_oauth_server, outage):
+    make_oauth_server(outage_rate=1, outage=outage)
+    with pytest.raises(ProviderUnavailable):
+        OAuthRegistry().providers["twitter"].fetch_username("code1", "verifier")
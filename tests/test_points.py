@@ -0,0 +1,109 @@
+import asyncio
+import pandas as pd
+import pytest
+import points
+from helpers import df_to_csv, csv_to_df
+from fakes import running
+
+HANDLE_COLS = {"discord": "Discord UserName", "twitter": "Twitter Username"}
+
+
+def write_exports(export_dir):
+    export_dir.mkdir(exist_ok=True)
+    pd.DataFrame({
+        "username": ["Alice", "bob"],
+        "role": ["Dev", "Designer"],
+        "messages": [400, 3],
+    }).to_csv(export_dir / "discord_1.csv", index=False)
+    pd.DataFrame({
+        "username": ["alice"],
+        "role": ["Problem Solver"],
+        "messages": [400],
+    }).to_csv(export_dir / "discord_2.csv", index=False)
+    pd.DataFrame({
+        "username": ["@Carol", "carol"],
+        "likes": [10, 0],
+        "retweets": [1, 0],
+    }).to_csv(export_dir / "tweets_1.csv", index=False)
+
+
+def contributors():
+    return pd.DataFrame({
+        "Discord UserName": ["ALICE", "bob", "zed"],
+        "Twitter Username": ["carol", "", ""],
+        "Wallet": ["", "", ""],
+        points.POINTS_COL: [1, 2, 3],
+    })
+
+
+def test_highest_role_and_capped_activity(tmp_path):
+    write_exports(tmp_path)
+    scores, timings = points.score_exports(tmp_path)
+
+    # Dev beats Problem Solver, 800 messages across both dumps are capped at 500
+    assert scores["discord"]["alice"] == pytest.approx(100 + 500*points.MESSAGE_POINTS)
+    assert scores["discord"]["bob"] == pytest.approx(60 + 3*points.MESSAGE_POINTS)
+    assert set(timings) == {"load", "score"}
+
+
+def test_handle_normalization(tmp_path):
+    write_exports(tmp_path)
+    scores, _ = points.score_exports(tmp_path)
+
+    # '@Carol' & 'carol' are the same handle, 'Alice' in the export matches 'ALICE' in the data
+    assert list(scores["twitter"].index) == ["carol"]
+    df = contributors()
+    points.apply_scores(df, scores, HANDLE_COLS)
+    assert df.loc[0, points.POINTS_COL] == pytest.approx(150 + scores["twitter"]["carol"], abs=0.01)
+
+
+def test_unmatched_rows_keep_points_and_reruns_change_nothing(tmp_path):
+    write_exports(tmp_path)
+    scores, _ = points.score_exports(tmp_path)
+    df = contributors()
+
+    assert points.apply_scores(df, scores, HANDLE_COLS) == 2
+    assert df.loc[2, points.POINTS_COL] == 3
+    assert points.apply_scores(df, scores, HANDLE_COLS) == 0
+
+
+def test_points_stay_float_through_csv(tmp_path):
+    write_exports(tmp_path)
+    scores, _ = points.score_exports(tmp_path)
+    df = contributors()
+    points.apply_scores(df, scores, HANDLE_COLS)
+    assert df[points.POINTS_COL].dtype == "float64"
+
+    df_to_csv(df, tmp_path / "data.csv")
+    df2 = csv_to_df(tmp_path / "data.csv")
+    assert df2[points.POINTS_COL].dtype == "float64"
+    assert df2[points.POINTS_COL].tolist() == df[points.POINTS_COL].tolist()
+
+
+def test_malformed_export_is_skipped(tmp_path):
+    write_exports(tmp_path)
+    # Missing the retweets column
+    pd.DataFrame({"username": ["dave"], "likes": [5]}).to_csv(tmp_path / "tweets_2.csv", index=False)
+    (tmp_path / "tweets_3.csv").write_text("")
+
+    scores, _ = points.score_exports(tmp_path)
+    assert list(scores["twitter"].index) == ["carol"]
+    assert "alice" in scores["discord"]
+
+
+def test_recalculation_job(make_bot, tmp_path):
+    bot, api, server = make_bot()
+    write_exports(tmp_path / "contributions")
+    pd.DataFrame({"username": ["dc1"], "role": ["dev"], "messages": [0]}).to_csv(
+        tmp_path / "contributions" / "discord_3.csv", index=False
+    )
+
+    async def scenario():
+        async with running(bot.application):
+            await bot.recalculate_points(None)
+
+    asyncio.run(scenario())
+    df = csv_to_df(bot.input_data_path)
+    assert df.loc[df["Discord UserName"] == "dc1", points.POINTS_COL].iloc[0] == 100
+    assert df.loc[df["Discord UserName"] == "dc2", points.POINTS_COL].iloc[0] == 2
+    assert set(bot.points_timings) == {"load", "score", "merge", "write", "total"}